@@ -1,9 +1,12 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import datetime
 import os
-import json
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 from plotly.subplots import make_subplots
 
 # Page config
@@ -33,51 +36,116 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=60)
 def load_trade_data():
     """Load the most recent trade data from logs directory"""
     log_dir = "logs"
     if not os.path.exists(log_dir):
         st.error("Logs directory not found!")
         return None
-    
-    # Find the most recent trade data file
-    trade_files = [f for f in os.listdir(log_dir) if f.startswith("trade_data_")]
-    if not trade_files:
+
+    # One scandir pass picks the newest feather and JSON candidates;
+    # the short TTL lets rapid reruns skip the directory walk entirely
+    latest_feather = None
+    latest_json = None
+    with os.scandir(log_dir) as it:
+        for entry in it:
+            name = entry.name
+            if not name.startswith("trade_data_"):
+                continue
+            if name.endswith(".feather"):
+                if latest_feather is None or name > latest_feather:
+                    latest_feather = name
+            elif name.endswith(".json"):
+                if latest_json is None or name > latest_json:
+                    latest_json = name
+
+    # Prefer the Arrow feather trade log: the columnar payload needs no
+    # parsing, just a memory-mapped read
+    if latest_feather:
+        path = os.path.join(log_dir, latest_feather)
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    if not latest_json:
         st.error("No trade data files found!")
         return None
-    
-    latest_file = max(trade_files)
-    with open(os.path.join(log_dir, latest_file), 'r') as f:
-        return json.load(f)
 
-def load_equity_data():
-    """Load equity data from parquet files"""
+    with open(os.path.join(log_dir, latest_json), 'rb') as f:
+        return orjson.loads(f.read())
+
+@st.cache_resource
+def load_equity_table():
+    """Load SPY parquet files as a single memory-mapped Arrow table"""
     data_dir = "SPY"  # SPY directory in current folder
     if not os.path.exists(data_dir):
-        st.error(f"Data directory not found: {data_dir}")
         return None
-    
+
     # Load parquet files for March, April, May
     files = []
     for month in [3, 4, 5]:
         file_path = os.path.join(data_dir, f"2025-{month:02d}.parquet")
         if os.path.exists(file_path):
-            files.append(pd.read_parquet(file_path))
-    
+            files.append(file_path)
+
     if not files:
+        return None
+
+    # Read only the columns the app uses; memory-mapped sources let the
+    # OS page cache back the table across Streamlit sessions
+    tables = [pq.read_table(pa.memory_map(f, 'r'), columns=['ts', 'c'])
+              for f in files]
+    return pa.concat_tables(tables)
+
+# cache_resource caches by reference and skips cache_data's pickle
+# round-trip; the returned DataFrame must be treated as read-only
+@st.cache_resource
+def load_equity_data():
+    """Load equity data from parquet files"""
+    table = load_equity_table()
+    if table is None:
         st.error("No equity data files found!")
         return None
-    
-    # Combine all data
-    df = pd.concat(files, ignore_index=True)
-    df['ts'] = pd.to_datetime(df['ts'], unit='ms')
+
+    df = table.to_pandas()
+    # Files store ts as a sorted Arrow timestamp; only convert if an old
+    # file still carries the raw int64 epoch-ms column
+    if not pd.api.types.is_datetime64_any_dtype(df['ts']):
+        df['ts'] = pd.to_datetime(df['ts'], unit='ms')
+    # Guarantee a globally sorted frame once here so downstream lookups
+    # (merge_asof, bucketing) never have to re-sort
+    if not df['ts'].is_monotonic_increasing:
+        df = df.sort_values('ts', ignore_index=True)
+    # float32 halves the in-process footprint and shortens the JSON
+    # Plotly ships to the browser; prices don't need float64 precision
+    df['c'] = df['c'].astype(np.float32)
     return df
 
+@st.cache_data
+def prepare_trades_df(trade_data):
+    """Convert raw trade records (list or DataFrame) to a DataFrame with
+    parsed timestamps"""
+    trades_df = pd.DataFrame(trade_data)
+    trades_df['date'] = pd.to_datetime(trades_df['date'])
+    trades_df['entry_time'] = pd.to_datetime(trades_df['entry_time']).astype('datetime64[ns]')
+    trades_df['exit_time'] = pd.to_datetime(trades_df['exit_time']).astype('datetime64[ns]')
+    return trades_df
+
+@st.cache_data
+def compute_trade_stats(trade_data):
+    """Aggregate headline metrics once per trade-data payload"""
+    trades_df = prepare_trades_df(trade_data)
+    total_trades = len(trades_df)
+    total_pnl = trades_df['total_pnl'].sum()
+    win_rate = (trades_df['total_pnl'] > 0).mean() * 100
+    avg_pnl = trades_df['total_pnl'].mean()
+    return total_trades, total_pnl, win_rate, avg_pnl
+
+@st.cache_resource(hash_funcs={list: lambda x: hash(orjson.dumps(x))})
 def plot_trade_analysis(trade_data):
     """Create trade analysis plots"""
     # Convert trade data to DataFrame
-    trades_df = pd.DataFrame(trade_data)
-    trades_df['date'] = pd.to_datetime(trades_df['date'])
+    trades_df = prepare_trades_df(trade_data)
     trades_df['cumulative_pnl'] = trades_df['total_pnl'].cumsum()
     
     # Create subplots
@@ -89,39 +157,33 @@ def plot_trade_analysis(trade_data):
                [{"type": "bar"}, {"type": "bar"}]]
     )
     
-    # Cumulative P&L
-    fig.add_trace(
-        go.Scatter(x=trades_df['date'], y=trades_df['cumulative_pnl'],
-                  mode='lines+markers', name='Cumulative P&L'),
-        row=1, col=1
-    )
-    
-    # P&L Distribution
-    fig.add_trace(
-        go.Histogram(x=trades_df['total_pnl'], nbinsx=20, name='P&L Distribution'),
-        row=1, col=2
-    )
-    
-    # Monthly Analysis
+    # Monthly Analysis (named aggregations keep the groupby on the
+    # Cython fast path; a lambda agg would fall back to per-group Python)
     trades_df['month'] = trades_df['date'].dt.strftime('%Y-%m')
-    monthly_stats = trades_df.groupby('month').agg({
-        'total_pnl': ['count', 'mean', lambda x: (x > 0).mean()]
-    }).reset_index()
-    
-    # Win Rate by Month
-    fig.add_trace(
-        go.Bar(x=monthly_stats['month'], 
-               y=monthly_stats[('total_pnl', '<lambda_0>')] * 100,
-               name='Win Rate'),
-        row=2, col=1
-    )
-    
-    # Average P&L by Month
-    fig.add_trace(
-        go.Bar(x=monthly_stats['month'], 
-               y=monthly_stats[('total_pnl', 'mean')],
-               name='Avg P&L'),
-        row=2, col=2
+    trades_df['_wins'] = (trades_df['total_pnl'] > 0).astype(np.float64)
+    monthly_stats = trades_df.groupby('month', sort=False).agg(
+        count=('total_pnl', 'size'),
+        mean_pnl=('total_pnl', 'mean'),
+        win_rate=('_wins', 'mean')
+    ).reset_index()
+
+    # Add all four subplot traces in one batched call, with numpy-typed
+    # data arrays
+    fig.add_traces(
+        [
+            go.Scatter(x=trades_df['date'].to_numpy(),
+                       y=trades_df['cumulative_pnl'].to_numpy(),
+                       mode='lines+markers', name='Cumulative P&L'),
+            go.Histogram(x=trades_df['total_pnl'].to_numpy(), nbinsx=20,
+                         name='P&L Distribution'),
+            go.Bar(x=monthly_stats['month'],
+                   y=monthly_stats['win_rate'].to_numpy() * 100,
+                   name='Win Rate'),
+            go.Bar(x=monthly_stats['month'],
+                   y=monthly_stats['mean_pnl'].to_numpy(),
+                   name='Avg P&L')
+        ],
+        rows=[1, 1, 2, 2], cols=[1, 2, 1, 2]
     )
     
     # Update layout
@@ -144,90 +206,136 @@ def plot_trade_analysis(trade_data):
     
     return fig
 
+@st.cache_resource(hash_funcs={list: lambda x: hash(orjson.dumps(x))})
 def plot_trade_details(trade_data, equity_data):
     """Create detailed trade visualization"""
     # Check if data is empty or None
     if trade_data is None or equity_data is None:
         return None
     
-    # Convert trade data to DataFrame if it's not already
-    if isinstance(trade_data, list):
-        trades_df = pd.DataFrame(trade_data)
-    else:
-        trades_df = trade_data
-        
+    trades_df = prepare_trades_df(trade_data)
+
     if trades_df.empty or equity_data.empty:
         return None
-    
-    trades_df['date'] = pd.to_datetime(trades_df['date'])
-    
+
+    # Resolve entry/exit prices in one vectorized pass instead of scanning
+    # the full equity frame once per trade (equity_data arrives sorted
+    # from the loader)
+    eq = equity_data[['ts', 'c']].copy()
+    eq['ts'] = eq['ts'].astype('datetime64[ns]')
+    trades_df = pd.merge_asof(
+        trades_df.sort_values('entry_time'),
+        eq.rename(columns={'c': 'entry_price'}),
+        left_on='entry_time', right_on='ts', direction='nearest'
+    ).drop(columns='ts')
+    trades_df = pd.merge_asof(
+        trades_df.sort_values('exit_time'),
+        eq.rename(columns={'c': 'exit_price'}),
+        left_on='exit_time', right_on='ts', direction='nearest'
+    ).drop(columns='ts')
+
     # Create figure
     fig = go.Figure()
-    
-    # Add SPY price
-    fig.add_trace(go.Scatter(
-        x=equity_data['ts'],
-        y=equity_data['c'],
+
+    # Downsample the SPY line to ~one bucket per plot pixel (min/max/mean
+    # per bucket) so the browser gets a few thousand points instead of
+    # every minute bar, and render with WebGL
+    nbuckets = 2000
+    bucket_size = max(len(equity_data) // nbuckets, 1)
+    buckets = equity_data.assign(bucket=np.arange(len(equity_data)) // bucket_size)
+    agg = buckets.groupby('bucket').agg(
+        ts=('ts', 'first'), lo=('c', 'min'), hi=('c', 'max'), mean=('c', 'mean')
+    )
+    # Rounded float32 arrays keep the serialized payload small
+    agg_ts = agg['ts'].to_numpy()
+    agg_lo = np.round(agg['lo'].to_numpy(np.float32), 2)
+    agg_hi = np.round(agg['hi'].to_numpy(np.float32), 2)
+    agg_mean = np.round(agg['mean'].to_numpy(np.float32), 2)
+
+    # Compose every trace first, then register them with one bulk
+    # add_traces call instead of per-trace add_trace validation passes
+    traces = []
+
+    # Translucent lo/hi silhouette behind the mean line
+    traces.append(go.Scattergl(
+        x=np.concatenate([agg_ts, agg_ts[::-1]]),
+        y=np.concatenate([agg_hi, agg_lo[::-1]]),
+        fill='toself',
+        fillcolor='rgba(0, 0, 255, 0.15)',
+        line=dict(width=0),
+        hoverinfo='skip',
+        name='SPY Range',
+        showlegend=False
+    ))
+
+    traces.append(go.Scattergl(
+        x=agg_ts,
+        y=agg_mean,
         mode='lines',
         name='SPY Price',
         line=dict(color='blue', width=1)
     ))
-    
-    # Add entry and exit points
+
+    # Add entry/exit points and strike lines as four aggregated traces
+    # (one trace per marker/line style, with None separators between
+    # trades) instead of four traces per trade
+    entry_x, entry_y = [], []
+    exit_x, exit_y = [], []
+    sell_x, sell_y = [], []
+    buy_x, buy_y = [], []
     for _, trade in trades_df.iterrows():
-        # Find the closest price point for entry and exit times
-        entry_price = equity_data[equity_data['ts'] == trade['entry_time']]['c']
-        exit_price = equity_data[equity_data['ts'] == trade['exit_time']]['c']
-        
-        if not entry_price.empty and not exit_price.empty:
-            # Entry point
-            fig.add_trace(go.Scatter(
-                x=[trade['entry_time']],
-                y=[entry_price.iloc[0]],
-                mode='markers',
-                marker=dict(symbol='triangle-up', size=10, color='green'),
-                name=f"Entry {trade['date'].date()}",
-                showlegend=False
-            ))
-            
-            # Exit point
-            fig.add_trace(go.Scatter(
-                x=[trade['exit_time']],
-                y=[exit_price.iloc[0]],
-                mode='markers',
-                marker=dict(symbol='triangle-down', size=10, color='red'),
-                name=f"Exit {trade['date'].date()}",
-                showlegend=False
-            ))
-            
-            # Add strike lines
-            fig.add_trace(go.Scatter(
-                x=[trade['entry_time'], trade['exit_time']],
-                y=[trade['sell_strike'], trade['sell_strike']],
-                mode='lines',
-                line=dict(color='orange', width=1, dash='dash'),
-                name=f"Sell Strike {trade['date'].date()}",
-                showlegend=False
-            ))
-            
-            fig.add_trace(go.Scatter(
-                x=[trade['entry_time'], trade['exit_time']],
-                y=[trade['buy_strike'], trade['buy_strike']],
-                mode='lines',
-                line=dict(color='purple', width=1, dash='dash'),
-                name=f"Buy Strike {trade['date'].date()}",
-                showlegend=False
-            ))
-    
+        if pd.notnull(trade['entry_price']) and pd.notnull(trade['exit_price']):
+            entry_x.append(trade['entry_time'])
+            entry_y.append(trade['entry_price'])
+            exit_x.append(trade['exit_time'])
+            exit_y.append(trade['exit_price'])
+            sell_x.extend([trade['entry_time'], trade['exit_time'], None])
+            sell_y.extend([trade['sell_strike'], trade['sell_strike'], None])
+            buy_x.extend([trade['entry_time'], trade['exit_time'], None])
+            buy_y.extend([trade['buy_strike'], trade['buy_strike'], None])
+
+    traces.append(go.Scatter(
+        x=np.asarray(entry_x), y=np.asarray(entry_y, dtype=np.float32),
+        mode='markers',
+        marker=dict(symbol='triangle-up', size=10, color='green'),
+        name='Entries'
+    ))
+
+    traces.append(go.Scatter(
+        x=np.asarray(exit_x), y=np.asarray(exit_y, dtype=np.float32),
+        mode='markers',
+        marker=dict(symbol='triangle-down', size=10, color='red'),
+        name='Exits'
+    ))
+
+    traces.append(go.Scatter(
+        x=sell_x, y=sell_y,
+        mode='lines',
+        line=dict(color='orange', width=1, dash='dash'),
+        name='Sell Strike'
+    ))
+
+    traces.append(go.Scatter(
+        x=buy_x, y=buy_y,
+        mode='lines',
+        line=dict(color='purple', width=1, dash='dash'),
+        name='Buy Strike'
+    ))
+
+    fig.add_traces(traces)
+
+
     # Update layout
     fig.update_layout(
         title="Trade Details with SPY Price",
         xaxis_title="Time",
         yaxis_title="Price",
         height=600,
-        showlegend=True
+        showlegend=True,
+        hovermode='x',
+        spikedistance=0
     )
-    
+
     return fig
 
 def main():
@@ -242,14 +350,10 @@ def main():
         return
     
     # Convert trade data to DataFrame for metrics
-    trades_df = pd.DataFrame(trade_data)
-    trades_df['date'] = pd.to_datetime(trades_df['date'])
-    
-    # Calculate metrics
-    total_trades = len(trades_df)
-    total_pnl = trades_df['total_pnl'].sum()
-    win_rate = (trades_df['total_pnl'] > 0).mean() * 100
-    avg_pnl = trades_df['total_pnl'].mean()
+    trades_df = prepare_trades_df(trade_data)
+
+    # Calculate metrics (cached across reruns)
+    total_trades, total_pnl, win_rate, avg_pnl = compute_trade_stats(trade_data)
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -276,8 +380,8 @@ def main():
     # Trade History Table
     st.markdown("### Trade History")
     trades_df['date'] = trades_df['date'].dt.date
-    trades_df['entry_time'] = pd.to_datetime(trades_df['entry_time']).dt.time
-    trades_df['exit_time'] = pd.to_datetime(trades_df['exit_time']).dt.time
+    trades_df['entry_time'] = trades_df['entry_time'].dt.time
+    trades_df['exit_time'] = trades_df['exit_time'].dt.time
     
     # Format columns
     display_df = trades_df[[
@@ -290,20 +394,14 @@ def main():
         'Credit', 'P&L', 'IV', 'Sell Delta'
     ]
     
-    # Format numeric columns with proper handling of None values
-    def format_currency(x):
-        return f"${x:.2f}" if pd.notnull(x) else "N/A"
-    
-    def format_percentage(x):
-        return f"{x:.2%}" if pd.notnull(x) else "N/A"
-    
-    # Apply formatting
-    display_df['Sell Strike'] = display_df['Sell Strike'].apply(format_currency)
-    display_df['Buy Strike'] = display_df['Buy Strike'].apply(format_currency)
-    display_df['Credit'] = display_df['Credit'].apply(format_currency)
-    display_df['P&L'] = display_df['P&L'].apply(format_currency)
-    display_df['IV'] = display_df['IV'].apply(format_percentage)
-    display_df['Sell Delta'] = display_df['Sell Delta'].apply(format_percentage)
+    # Format numeric columns in two batched passes with proper handling
+    # of None values
+    currency_cols = ['Sell Strike', 'Buy Strike', 'Credit', 'P&L']
+    percentage_cols = ['IV', 'Sell Delta']
+    display_df[currency_cols] = display_df[currency_cols].map(
+        lambda x: f"${x:.2f}" if pd.notnull(x) else "N/A")
+    display_df[percentage_cols] = display_df[percentage_cols].map(
+        lambda x: f"{x:.2%}" if pd.notnull(x) else "N/A")
     
     st.dataframe(display_df, use_container_width=True)
 
